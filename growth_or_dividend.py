@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from analyze_investments import pct_change_mean
+
 class StockCategorizer:
     def __init__(self, income_statement, ratios, payouts, snapshot):
         self.income_statement = income_statement
@@ -15,7 +17,7 @@ class StockCategorizer:
         
         # Calculate dividend growth
         recent_dividends = self.payouts[self.payouts['Payout Type'] == 'Dividend'].head(5)
-        dividend_growth = recent_dividends['Payout %'].pct_change().mean() * 100
+        dividend_growth = pct_change_mean(recent_dividends['Payout %'])
         
         dividend_score = (
             min(dividend_yield / 5 * 40, 40) +  # Up to 40 points for yield
@@ -33,9 +35,9 @@ class StockCategorizer:
     def analyze_growth_strength(self):
         """Analyze growth characteristics"""
         # Calculate 5-year growth rates
-        revenue_growth = self.income_statement.loc['Sales'].pct_change().mean() * 100
-        profit_growth = self.income_statement.loc['PAT'].pct_change().mean() * 100
-        eps_growth = self.income_statement.loc['EPS'].pct_change().mean() * 100
+        revenue_growth = pct_change_mean(self.income_statement.loc['Sales'])
+        profit_growth = pct_change_mean(self.income_statement.loc['PAT'])
+        eps_growth = pct_change_mean(self.income_statement.loc['EPS'])
         
         # Get profitability metrics
         net_margin = self.ratios.loc['Net Profit Margin', '2023']
@@ -84,11 +86,12 @@ Primary Strength: {"Dividend payments and stability" if category == "STRONG DIVI
 """
         return report
 
-# Load data and analyze
-income_statement = pd.read_csv('financial_data/income_statement.csv', index_col='Metric')
-ratios = pd.read_csv('financial_data/financial_ratios.csv', index_col='Metric')
-payouts = pd.read_csv('financial_data/payouts.csv')
-snapshot = pd.read_csv('financial_data/company_snapshot.csv').iloc[0]
+if __name__ == "__main__":
+    # Load data and analyze
+    income_statement = pd.read_csv('financial_data/income_statement.csv', index_col='Metric')
+    ratios = pd.read_csv('financial_data/financial_ratios.csv', index_col='Metric')
+    payouts = pd.read_csv('financial_data/payouts.csv')
+    snapshot = pd.read_csv('financial_data/company_snapshot.csv').iloc[0]
 
-categorizer = StockCategorizer(income_statement, ratios, payouts, snapshot)
-print(categorizer.categorize_stock())
\ No newline at end of file
+    categorizer = StockCategorizer(income_statement, ratios, payouts, snapshot)
+    print(categorizer.categorize_stock())
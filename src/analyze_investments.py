@@ -1,6 +1,23 @@
 import pandas as pd
 import numpy as np
 
+def pct_change_mean(series):
+    """Mean period-over-period change of a series in percent, like pct_change().mean() * 100"""
+    values = series.to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = np.diff(values) / values[:-1]
+    changes = changes[~np.isnan(changes)]
+    return changes.mean() * 100 if changes.size else np.nan
+
+def yearly_dividend_payouts(payouts: pd.DataFrame) -> pd.Series:
+    """Total dividend payout % per year, indexed by the integer year"""
+    is_dividend = payouts['Payout Type'] == 'Dividend'
+    div_data = payouts.loc[is_dividend, ['Year', 'Payout %']]
+    # Rows without a numeric year are left out, as the string groupby did
+    years = pd.to_numeric(div_data['Year'].str.slice(0, 4), errors='coerce')
+    has_year = years.notna()
+    return div_data.loc[has_year, 'Payout %'].groupby(years[has_year].astype('int16'), sort=True).sum()
+
 class DividendAnalyzer:
     def __init__(self, payouts: pd.DataFrame, ratios: pd.DataFrame, income_statement: pd.DataFrame):
         self.payouts = payouts
@@ -8,14 +25,12 @@ class DividendAnalyzer:
         self.income_statement = income_statement
 
     def analyze_dividend_quality(self):
-        div_data = self.payouts[self.payouts['Payout Type'] == 'Dividend']
-        
         # Analyze consistency
-        yearly_payouts = div_data.groupby(div_data['Year'].str[:4])['Payout %'].sum()
+        yearly_payouts = yearly_dividend_payouts(self.payouts)
         consistency_score = min(len(yearly_payouts[yearly_payouts > 0]) / len(yearly_payouts) * 40, 40)
         
         # Analyze growth trend
-        recent_growth = yearly_payouts.pct_change().tail(5).mean() * 100
+        recent_growth = pct_change_mean(yearly_payouts.iloc[-6:])
         growth_score = min(recent_growth / 15 * 30, 30)
         
         # Analyze yield and sustainability
@@ -24,7 +39,7 @@ class DividendAnalyzer:
         sustainability_score = max(0, (70 - payout_ratio) / 70 * 30)
         
         # Analyze earnings coverage
-        eps_growth = self.income_statement.loc['EPS'].pct_change().mean() * 100
+        eps_growth = pct_change_mean(self.income_statement.loc['EPS'])
         
         total_score = consistency_score + growth_score + sustainability_score
         
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from analyze_investments import pct_change_mean
+
 class StockCategorizer:
     def __init__(self, income_statement, ratios, payouts, snapshot):
         self.income_statement = income_statement
@@ -15,7 +17,7 @@ class StockCategorizer:
         
         # Calculate dividend growth
         recent_dividends = self.payouts[self.payouts['Payout Type'] == 'Dividend'].head(5)
-        dividend_growth = recent_dividends['Payout %'].pct_change().mean() * 100
+        dividend_growth = pct_change_mean(recent_dividends['Payout %'])
         
         dividend_score = (
             min(dividend_yield / 5 * 40, 40) +  # Up to 40 points for yield
@@ -33,9 +35,9 @@ class StockCategorizer:
     def analyze_growth_strength(self):
         """Analyze growth characteristics"""
         # Calculate 5-year growth rates
-        revenue_growth = self.income_statement.loc['Sales'].pct_change().mean() * 100
-        profit_growth = self.income_statement.loc['PAT'].pct_change().mean() * 100
-        eps_growth = self.income_statement.loc['EPS'].pct_change().mean() * 100
+        revenue_growth = pct_change_mean(self.income_statement.loc['Sales'])
+        profit_growth = pct_change_mean(self.income_statement.loc['PAT'])
+        eps_growth = pct_change_mean(self.income_statement.loc['EPS'])
         
         # Get profitability metrics
         net_margin = self.ratios.loc['Net Profit Margin', '2023']
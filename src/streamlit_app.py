@@ -3,74 +3,119 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
-import os
 
 # Import analysis classes
-from analyze_investments import DividendAnalyzer
+from analyze_investments import DividendAnalyzer, yearly_dividend_payouts
 from growth_or_dividend import StockCategorizer
 
 # Import stock scrapper
 from stock_scrapper import scrape_company_data
 
+# Read data once; cleared after a new download. Errors propagate so a
+# failed read is never cached.
+@st.cache_data(ttl=3600, show_spinner=False)
+def read_financial_data():
+    payouts = pd.read_csv(
+        'financial_data/payouts.csv',
+        usecols=['Year', 'Payout Type', 'Payout %'],
+        dtype={'Year': str, 'Payout Type': str, 'Payout %': np.float64}
+    )
+    ratios = pd.read_csv('financial_data/financial_ratios.csv', index_col='Metric')
+    income_statement = pd.read_csv('financial_data/income_statement.csv', index_col='Metric')
+    balance_sheet = pd.read_csv('financial_data/balance_sheet.csv', index_col='Metric')
+    snapshot = pd.read_csv('financial_data/company_snapshot.csv', nrows=1).iloc[0]
+    cash_flow = pd.read_csv('financial_data/cash_flow.csv', index_col='Metric')
+    
+    return {
+        'payouts': payouts,
+        'ratios': ratios,
+        'income_statement': income_statement,
+        'balance_sheet': balance_sheet,
+        'snapshot': snapshot,
+        'cash_flow': cash_flow
+    }
+
 # Load data
 def load_financial_data():
     try:
-        payouts = pd.read_csv('financial_data/payouts.csv')
-        ratios = pd.read_csv('financial_data/financial_ratios.csv', index_col='Metric')
-        income_statement = pd.read_csv('financial_data/income_statement.csv', index_col='Metric')
-        balance_sheet = pd.read_csv('financial_data/balance_sheet.csv', index_col='Metric')
-        snapshot = pd.read_csv('financial_data/company_snapshot.csv').iloc[0]
-        cash_flow = pd.read_csv('financial_data/cash_flow.csv', index_col='Metric')
-        
-        return {
-            'payouts': payouts,
-            'ratios': ratios,
-            'income_statement': income_statement,
-            'balance_sheet': balance_sheet,
-            'snapshot': snapshot,
-            'cash_flow': cash_flow
-        }
+        return read_financial_data()
     except Exception as e:
         st.error(f"Error loading financial data: {e}")
         return None
 
+# Cache analysis reports so page switches don't recompute them
+@st.cache_data
+def get_dividend_report(payouts, ratios, income_statement):
+    analyzer = DividendAnalyzer(payouts, ratios, income_statement)
+    return analyzer.generate_report()
+
+@st.cache_data
+def get_growth_report(income_statement, ratios, payouts, snapshot):
+    categorizer = StockCategorizer(income_statement, ratios, payouts, snapshot)
+    return categorizer.categorize_stock()
+
+@st.cache_data
+def get_yearly_payouts(payouts):
+    return yearly_dividend_payouts(payouts)
+
+# Cache figure construction on plain tuples so reruns reuse the built figure
+@st.cache_data
+def make_payouts_line(years, values):
+    return px.line(
+        x=list(years), 
+        y=list(values), 
+        title='Yearly Dividend Payouts',
+        labels={'x': 'Year', 'y': 'Total Dividend Payout (%)'}
+    )
+
+@st.cache_data
+def make_revenue_profit_bar(years, revenue, profit):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=list(years), y=list(revenue), name='Revenue'))
+    fig.add_trace(go.Bar(x=list(years), y=list(profit), name='Profit After Tax'))
+    
+    fig.update_layout(
+        title='Revenue and Profit Trend',
+        xaxis_title='Year',
+        yaxis_title='Amount',
+        barmode='group'
+    )
+    return fig
+
+@st.cache_data
+def make_composition_pie(items):
+    return px.pie(
+        values=[value for _, value in items], 
+        names=[name for name, _ in items], 
+        title='Financial Composition'
+    )
+
 def dividend_analysis_page(data):
     st.header("Dividend Quality Analysis")
     
-    # Initialize Dividend Analyzer
-    analyzer = DividendAnalyzer(data['payouts'], data['ratios'], data['income_statement'])
-    
     # Generate report
-    report = analyzer.generate_report()
+    report = get_dividend_report(data['payouts'], data['ratios'], data['income_statement'])
     st.markdown(report)
     
     # Visualize Dividend Metrics
     st.subheader("Dividend Metrics Visualization")
     
     # Yearly Payouts
-    yearly_payouts = data['payouts'][data['payouts']['Payout Type'] == 'Dividend'].groupby(data['payouts']['Year'].str[:4])['Payout %'].sum()
+    yearly_payouts = get_yearly_payouts(data['payouts'])
     
-    fig = px.line(
-        x=yearly_payouts.index, 
-        y=yearly_payouts.values, 
-        title='Yearly Dividend Payouts',
-        labels={'x': 'Year', 'y': 'Total Dividend Payout (%)'}
-    )
+    fig = make_payouts_line(tuple(yearly_payouts.index), tuple(yearly_payouts.values))
     st.plotly_chart(fig)
 
 def growth_analysis_page(data):
     st.header("Stock Growth Analysis")
     
-    # Initialize Stock Categorizer
-    categorizer = StockCategorizer(
+    # Generate report
+    report = get_growth_report(
         data['income_statement'], 
         data['ratios'], 
         data['payouts'], 
         data['snapshot']
     )
-    
-    # Generate report
-    report = categorizer.categorize_stock()
     st.markdown(report)
     
     # Visualize Growth Metrics
@@ -81,16 +126,7 @@ def growth_analysis_page(data):
     revenue = data['income_statement'].loc['Sales'][1:]
     profit = data['income_statement'].loc['PAT'][1:]
     
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=years, y=revenue, name='Revenue'))
-    fig.add_trace(go.Bar(x=years, y=profit, name='Profit After Tax'))
-    
-    fig.update_layout(
-        title='Revenue and Profit Trend',
-        xaxis_title='Year',
-        yaxis_title='Amount',
-        barmode='group'
-    )
+    fig = make_revenue_profit_bar(tuple(years), tuple(revenue), tuple(profit))
     st.plotly_chart(fig)
 
 def company_snapshot_page(data):
@@ -120,27 +156,27 @@ def company_snapshot_page(data):
     # Pie chart of financial composition
     st.subheader("Financial Composition")
     
-    # Calculate total debt by summing interest-bearing liabilities
-    total_debt = (
-        data['balance_sheet'].loc['Interest Bearing Long Term Liability'].iloc[-1] + 
-        data['balance_sheet'].loc['Interest Bearing Short Term Liability'].iloc[-1]
-    )
+    # Select the last year column once per statement
+    latest_bs = data['balance_sheet'].iloc[:, -1]
+    latest_is = data['income_statement'].iloc[:, -1]
     
-    composition_data = {
-        'Revenue': data['income_statement'].loc['Sales'].iloc[-1],
-        'Profit': data['income_statement'].loc['PAT'].iloc[-1],
+    # Calculate total debt by summing interest-bearing liabilities
+    total_debt = latest_bs[[
+        'Interest Bearing Long Term Liability',
+        'Interest Bearing Short Term Liability'
+    ]].sum(skipna=False)
+    
+    composition_data = pd.Series({
+        'Revenue': latest_is['Sales'],
+        'Profit': latest_is['PAT'],
         'Debt': total_debt,
-        'Equity': data['balance_sheet'].loc['Shareholder Equity'].iloc[-1]
-    }
+        'Equity': latest_bs['Shareholder Equity']
+    })
     
     # Remove any zero or NaN values
-    composition_data = {k: v for k, v in composition_data.items() if v > 0}
+    composition_data = composition_data.loc[lambda s: s > 0]
     
-    fig = px.pie(
-        values=list(composition_data.values()), 
-        names=list(composition_data.keys()), 
-        title='Financial Composition'
-    )
+    fig = make_composition_pie(tuple(composition_data.items()))
     st.plotly_chart(fig)
 
 def data_download_page():
@@ -149,32 +185,31 @@ def data_download_page():
     # Input for stock symbol
     symbol = st.text_input("Enter Stock Symbol (e.g., MARI)", value="MARI").upper()
     
+    # Responses are cached for a few hours; allow fetching fresh data on demand
+    force_refresh = st.checkbox("Bypass cache and fetch fresh data")
+    
     # Download button
     if st.button("Download Financial Data"):
         try:
-            # Create financial_data directory if it doesn't exist
-            if not os.path.exists('financial_data'):
-                os.makedirs('financial_data')
-            
             # Start scraping
             with st.spinner(f"Downloading data for {symbol}..."):
-                scrape_company_data(symbol)
+                saved = scrape_company_data(symbol, force_refresh=force_refresh)
+            
+            # Drop the cached data so other pages pick up the new files
+            read_financial_data.clear()
+            
+            if not saved:
+                st.error(f"No data could be downloaded for {symbol}")
+                return
             
             # List downloaded files
             st.success(f"Successfully downloaded data for {symbol}")
             
-            # Show list of downloaded files
+            # Show downloaded files with a preview of the frames just scraped
             st.subheader("Downloaded Files:")
-            files = os.listdir('financial_data')
-            for file in files:
+            for file, df in saved.items():
                 st.write(file)
-                
-                # Optional: Show file preview
-                try:
-                    df = pd.read_csv(os.path.join('financial_data', file))
-                    st.dataframe(df.head())
-                except Exception as e:
-                    st.error(f"Could not preview {file}: {e}")
+                st.dataframe(df.head())
         
         except Exception as e:
             st.error(f"Error downloading data: {e}")
@@ -182,13 +217,6 @@ def data_download_page():
 def main():
     st.title("Financial Analysis Dashboard")
     
-    # Load financial data
-    data = load_financial_data()
-    
-    if data is None:
-        st.error("Could not load financial data. Please ensure all CSV files are present.")
-        return
-    
     # Create sidebar navigation
     page = st.sidebar.selectbox(
         "Select Analysis", 
@@ -200,16 +228,25 @@ def main():
         ]
     )
     
-    # Render selected page
+    # The download page works without any data on disk
     if page == "Data Download":
         data_download_page()
-    elif page == "Company Snapshot":
+        return
+    
+    # Load financial data once for the analysis pages
+    data = load_financial_data()
+    
+    if data is None:
+        st.error("Could not load financial data. Please ensure all CSV files are present.")
+        return
+    
+    # Render selected page
+    if page == "Company Snapshot":
         company_snapshot_page(data)
     elif page == "Dividend Analysis":
         dividend_analysis_page(data)
     elif page == "Growth Analysis":
         growth_analysis_page(data)
 
-
 if __name__ == "__main__":
     main()
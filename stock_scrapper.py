@@ -1,9 +1,16 @@
 import pandas as pd
 from bs4 import BeautifulSoup
 import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+import html
+import io
 import os
+import re
 import logging
 import traceback
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +22,79 @@ logging.basicConfig(
     ]
 )
 
+# Browser User-Agent sent with every request
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Shared session so requests to sarmaaya.pk reuse one keep-alive connection.
+# GET responses are cached on disk so repeat scrapes of a symbol skip the network.
+_SESSION = requests_cache.CachedSession(
+    'sarmaaya_cache',
+    backend='sqlite',
+    expire_after=timedelta(hours=6),
+    allowable_methods=('GET',)
+)
+_SESSION.headers.update(_HEADERS)
+# Keep one pooled connection per concurrent fetch in scrape_company_data
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+# Seconds to wait on sarmaaya.pk before giving up on a request
+_TIMEOUT = 10
+
+# Map of snapshot titles to keys
+_SNAPSHOT_FIELDS = {
+    'Current Price': 'Current',
+    'Volume': 'Volume',
+    'Dividend': 'Dividend',
+    'Dividend Yield': 'Dividend_Yield',
+    'Price to Earnings Ratio': 'PE_Ratio',
+    'Earnings Per Share': 'EPS',  # Fixed the field name
+    'EPS': 'EPS',  # Alternative field name
+    'Book Value': 'Book_Value',
+    'Price to Book': 'PB_Ratio',
+    'Market Cap': 'Market_Cap',
+    'Debt to Equity': 'Debt_to_Equity',
+    'Net Profit Margin': 'Net_Profit_Margin',
+    'Gross Profit Margin': 'Gross_Profit_Margin',
+    'Current Ratio': 'Current_Ratio',
+    'Shares': 'Shares',
+    'FreeFloat': 'Free_Float',
+    'Free Float %': 'Free_Float_Percent',
+    'Equity to Asset': 'Equity_to_Asset',
+    'Interest': 'Interest_Cover',
+    'Beta': 'Beta',
+    'Upper/Lower Cap': 'Upper_Lower_Cap',
+    '52 Week High': '52W_High',
+    '52 Week Low': '52W_Low',
+    'High': 'High',
+    'Low': 'Low'
+}
+
+# <strong title="...">label</strong><br/>value pairs in the snapshot block
+_SNAPSHOT_PAIR_RE = re.compile(
+    r'<strong[^>]*\stitle="([^"]*)"[^>]*>(?:(?!</strong>).)*</strong>\s*<br\s*/?>([^<]*)',
+    re.DOTALL
+)
+
+# Dictionary to map tab IDs to file names
+_TAB_MAPPING = {
+    'nav-statement': 'income_statement.csv',
+    'nav-balance': 'balance_sheet.csv',
+    'nav-cash': 'cash_flow.csv',
+    'nav-ratioFinance': 'financial_ratios.csv',
+    'nav-equity': 'equity.csv'
+}
+
+# Multipliers for the K/M/B suffixes used on sarmaaya.pk
+_SCALE = {'K': 1e3, 'M': 1e6, 'B': 1e9}
+
+# Cell text meaning "no value", converted to 0 without a warning
+_PLACEHOLDERS = ['-', '', 'N/A', 'None', 'null']
+
+# Characters stripped from numeric cells before parsing
+_STRIP_TBL = str.maketrans('', '', ',%()')
+_STRIP_RE = re.compile(r'[,%()]')
+
 def clean_value(value):
     """Convert string values like '1.26 K' or '147.00 B' to float with improved validation"""
     if value is None:
@@ -25,31 +105,60 @@ def clean_value(value):
         
     if isinstance(value, str):
         value = value.strip()
-        if value in ['-', '', 'N/A', 'None', 'null']:
+        if value in _PLACEHOLDERS:
             return 0
             
         # Remove commas, parentheses, and percentage signs
-        value = value.replace(',', '').replace('%', '').replace('(', '').replace(')', '')
+        value = value.translate(_STRIP_TBL)
         
         try:
-            # Handle K (thousands)
-            if 'K' in value:
-                return float(value.replace('K', '')) * 1000
-            # Handle M (millions)
-            elif 'M' in value:
-                return float(value.replace('M', '')) * 1000000
-            # Handle B (billions)
-            elif 'B' in value:
-                return float(value.replace('B', '')) * 1000000000
-            # Handle negative values with brackets
-            elif value.startswith('(') and value.endswith(')'):
-                return -float(value[1:-1])
+            # Handle K/M/B (thousands, millions, billions) from the last character
+            scale = _SCALE.get(value[-1:])
+            if scale:
+                return float(value[:-1]) * scale
             return float(value)
         except (ValueError, TypeError):
             logging.warning(f"Could not convert value '{value}' to float, returning 0")
             return 0
     return 0
 
+def clean_series(series):
+    """Vectorized clean_value for a column of raw cell strings"""
+    raw = series.astype(str).str.strip()
+    values = raw.str.replace(_STRIP_RE, '', regex=True)
+    scale = values.str[-1:].map(_SCALE).fillna(1.0)
+    numbers = pd.to_numeric(values.str.rstrip('KMB').str.strip(), errors='coerce')
+    
+    # Report cells that are neither numbers nor known placeholders
+    unparsed = numbers.isna() & series.notna() & ~raw.isin(_PLACEHOLDERS)
+    for value in raw[unparsed]:
+        logging.warning(f"Could not convert value '{value}' to float, returning 0")
+    
+    return (numbers * scale).fillna(0)
+
+def _snapshot_pairs(snapshot_table):
+    """Return (title, value) text pairs for the labelled values in the snapshot block"""
+    return [
+        (html.unescape(title), html.unescape(value).strip())
+        for title, value in _SNAPSHOT_PAIR_RE.findall(str(snapshot_table))
+    ]
+
+def _snapshot_tree_values(snapshot_table, titles):
+    """Walk the parse tree for the given field titles, taking the first titled
+    <strong> tag containing each one and the text after its next <br>"""
+    tags = {}
+    for tag in snapshot_table.find_all('strong', title=True):
+        for title in titles:
+            if title not in tags and title in tag['title']:
+                tags[title] = tag
+    
+    values = {}
+    for title, tag in tags.items():
+        br = tag.find_next('br')
+        if br and isinstance(br.next_sibling, str):
+            values[title] = br.next_sibling.strip()
+    return values
+
 def scrape_company_snapshot(soup):
     """Scrape company snapshot data from the soup object"""
     logging.info("Starting to scrape company snapshot")
@@ -61,51 +170,28 @@ def scrape_company_snapshot(soup):
             logging.warning("Company snapshot table not found")
             return {}
         
-        # Map of titles to keys
-        fields = {
-            'Current Price': 'Current',
-            'Volume': 'Volume',
-            'Dividend': 'Dividend',
-            'Dividend Yield': 'Dividend_Yield',
-            'Price to Earnings Ratio': 'PE_Ratio',
-            'Earnings Per Share': 'EPS',  # Fixed the field name
-            'EPS': 'EPS',  # Alternative field name
-            'Book Value': 'Book_Value',
-            'Price to Book': 'PB_Ratio',
-            'Market Cap': 'Market_Cap',
-            'Debt to Equity': 'Debt_to_Equity',
-            'Net Profit Margin': 'Net_Profit_Margin',
-            'Gross Profit Margin': 'Gross_Profit_Margin',
-            'Current Ratio': 'Current_Ratio',
-            'Shares': 'Shares',
-            'FreeFloat': 'Free_Float',
-            'Free Float %': 'Free_Float_Percent',
-            'Equity to Asset': 'Equity_to_Asset',
-            'Interest': 'Interest_Cover',
-            'Beta': 'Beta',
-            'Upper/Lower Cap': 'Upper_Lower_Cap',
-            '52 Week High': '52W_High',
-            '52 Week Low': '52W_Low',
-            'High': 'High',
-            'Low': 'Low'
-        }
+        # Take the first labelled value whose title contains each field name
+        matches = {}
+        for tag_title, value in _snapshot_pairs(snapshot_table):
+            for title in _SNAPSHOT_FIELDS:
+                if title not in matches and title in tag_title:
+                    matches[title] = value
+        
+        # Fall back to the parse tree for fields whose markup the pattern missed
+        missing = [title for title in _SNAPSHOT_FIELDS if title not in matches]
+        if missing:
+            recovered = _snapshot_tree_values(snapshot_table, missing)
+            if recovered:
+                logging.warning(f"Snapshot pattern missed {list(recovered)}, read them from the parse tree")
+                matches.update(recovered)
         
         # Process each field with improved error handling
-        for title, key in fields.items():
-            tag = snapshot_table.find('strong', title=lambda x: x and title in x)
-            if tag and tag.find_next('br'):
-                value = tag.find_next('br').next_sibling.strip()
-                snapshot_data[key] = clean_value(value)
-                if key == 'EPS' and key not in snapshot_data:
-                    # Try alternative ways to find EPS
-                    eps_tag = snapshot_table.find('strong', title=lambda x: x and 'EPS' in x)
-                    if eps_tag and eps_tag.find_next('br'):
-                        value = eps_tag.find_next('br').next_sibling.strip()
-                        snapshot_data[key] = clean_value(value)
-                    else:
-                        # Set default EPS if not found
-                        snapshot_data[key] = 0
-                        logging.warning("EPS value not found in snapshot data")
+        for title, key in _SNAPSHOT_FIELDS.items():
+            if title in matches:
+                snapshot_data[key] = clean_value(matches[title])
+        
+        if 'EPS' not in snapshot_data:
+            logging.warning("EPS value not found in snapshot data")
         
         return snapshot_data
     except Exception as e:
@@ -113,31 +199,16 @@ def scrape_company_snapshot(soup):
         logging.debug(traceback.format_exc())
         raise
 
-def scrape_financial_data(url):
-    """Scrape financial data from the given URL"""
-    logging.info(f"Starting to scrape financial data from {url}")
+def scrape_financial_data(response):
+    """Scrape financial data from a fetched all_financials response.
+    Returns the saved DataFrames keyed by file name."""
+    logging.info(f"Starting to scrape financial data from {response.url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Create output directory if it doesn't exist
-        if not os.path.exists('financial_data'):
-            os.makedirs('financial_data')
-        
-        # Dictionary to map tab IDs to file names
-        tab_mapping = {
-            'nav-statement': 'income_statement.csv',
-            'nav-balance': 'balance_sheet.csv',
-            'nav-cash': 'cash_flow.csv',
-            'nav-ratioFinance': 'financial_ratios.csv',
-            'nav-equity': 'equity.csv'
-        }
+        soup = BeautifulSoup(response.content, 'lxml')
         
         # Process each tab
-        for tab_id, filename in tab_mapping.items():
+        saved = {}
+        for tab_id, filename in _TAB_MAPPING.items():
             logging.info(f"Processing tab: {tab_id}")
             tab_content = soup.find('div', {'id': tab_id})
             if not tab_content:
@@ -151,82 +222,83 @@ def scrape_financial_data(url):
                     # Extract headers (years)
                     headers = ['Metric'] + [th.text.strip() for th in table.find('tr').find_all('th')[1:]]
                     
-                    # Extract rows
-                    rows = []
-                    for tr in table.find_all('tr')[1:]:  # Skip header row
-                        cells = tr.find_all(['td', 'th'])
-                        if cells:
-                            row = [cells[0].text.strip()]  # Metric name
-                            row.extend([clean_value(cell.text.strip()) for cell in cells[1:]])
-                            if len(row) == len(headers):  # Only add rows that match header length
-                                rows.append(row)
+                    # Drop rows whose cell count doesn't match the header row before
+                    # parsing: read_html would pad short rows with '' and widen the
+                    # whole table for long ones
+                    for tr in table.find_all('tr')[1:]:
+                        if len(tr.find_all(['td', 'th'])) != len(headers):
+                            tr.decompose()
+                    
+                    # Parse the table into a DataFrame, keeping metric names as text
+                    df = pd.read_html(
+                        io.StringIO(str(table)),
+                        flavor='lxml',
+                        header=0,
+                        keep_default_na=False,
+                        thousands=None,
+                        converters={0: str}
+                    )[0]
+                    df = df.iloc[:, :len(headers)]
+                    df.columns = headers
                     
-                    # Create DataFrame and save to CSV
-                    df = pd.DataFrame(rows, columns=headers)
+                    # Convert the year columns in one pass each, by position since
+                    # the page may repeat a year heading
+                    for i in range(1, len(headers)):
+                        df.isetitem(i, clean_series(df.iloc[:, i]))
+                    
+                    # Save to CSV
                     output_path = os.path.join('financial_data', filename)
                     df.to_csv(output_path, index=False)
+                    saved[filename] = df
                     print(f"Saved {filename}")
+        
+        return saved
     except Exception as e:
         logging.error(f"Error in scrape_financial_data: {str(e)}")
         logging.debug(traceback.format_exc())
         raise
 
-def scrape_payout_data(url):
-    """Scrape payout data from the given URL"""
-    logging.info(f"Starting to scrape payout data from {url}")
+def scrape_payout_data(response):
+    """Scrape payout data from a fetched company_payouts response.
+    Returns the saved DataFrame keyed by file name."""
+    logging.info(f"Starting to scrape payout data from {response.url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Parse the payout table straight into a DataFrame
+        try:
+            df = pd.read_html(
+                io.BytesIO(response.content),
+                attrs={'id': 'company-payouts'},
+                flavor='lxml',
+                keep_default_na=False
+            )[0]
+        except ValueError:
+            logging.warning("Payout table not found")
+            return {}
         
-        # Create output directory if it doesn't exist
-        if not os.path.exists('financial_data'):
-            os.makedirs('financial_data')
+        # Convert numeric columns
+        numeric_columns = ['Payout %', 'Face Value']
+        for col in numeric_columns:
+            if col in df.columns:
+                df[col] = clean_series(df[col])
         
-        # Find the payout table
-        table = soup.find('table', {'id': 'company-payouts'})
-        if not table:
-            logging.warning("Payout table not found")
-            return
-            
-        if table:
-            # Extract headers
-            headers = [th.text.strip() for th in table.find('thead').find_all('th')]
-            
-            # Extract rows
-            rows = []
-            for tr in table.find('tbody').find_all('tr'):
-                cells = tr.find_all('td')
-                row = [cell.text.strip() for cell in cells]
-                rows.append(row)
-            
-            # Create DataFrame
-            df = pd.DataFrame(rows, columns=headers)
-            
-            # Convert numeric columns
-            numeric_columns = ['Payout %', 'Face Value']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: clean_value(x) if x else 0)
-            
-            # Save to CSV
-            output_path = os.path.join('financial_data', 'payouts.csv')
-            df.to_csv(output_path, index=False)
-            print("Saved payouts.csv")
+        # Save to CSV
+        output_path = os.path.join('financial_data', 'payouts.csv')
+        df.to_csv(output_path, index=False)
+        print("Saved payouts.csv")
+        return {'payouts.csv': df}
     except Exception as e:
         logging.error(f"Error in scrape_payout_data: {str(e)}")
         logging.debug(traceback.format_exc())
         raise
 
-def scrape_company_data(symbol):
-    """Main function to scrape all company data"""
+def scrape_company_data(symbol, force_refresh=False):
+    """Main function to scrape all company data.
+    Returns the saved DataFrames keyed by file name, so callers can use them
+    without re-reading the CSVs. Set force_refresh to bypass the HTTP cache."""
     logging.info(f"Starting to scrape data for company symbol: {symbol}")
     
     # Create output directory if it doesn't exist
-    if not os.path.exists('financial_data'):
-        os.makedirs('financial_data')
+    os.makedirs('financial_data', exist_ok=True)
     
     base_url = "https://sarmaaya.pk"
     financial_url = f"{base_url}/ajax/widgets/all_financials.php?symbol={symbol}"
@@ -234,16 +306,24 @@ def scrape_company_data(symbol):
     company_url = f"{base_url}/psx/company/{symbol}"
     
     try:
-        # Scrape company snapshot
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
+        # Fetch the company page and both data widgets concurrently
         logging.info(f"Requesting company page: {company_url}")
-        response = requests.get(company_url, headers=headers)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            company_future = executor.submit(
+                _SESSION.get, company_url, timeout=_TIMEOUT, force_refresh=force_refresh
+            )
+            financial_future = executor.submit(
+                _SESSION.get, financial_url, timeout=_TIMEOUT, force_refresh=force_refresh
+            )
+            payout_future = executor.submit(
+                _SESSION.get, payout_url, timeout=_TIMEOUT, force_refresh=force_refresh
+            )
+        
+        # Scrape company snapshot
+        response = company_future.result()
         response.raise_for_status()  # Raise an exception for bad status codes
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(response.content, 'lxml')
         
         # Get company snapshot data
         snapshot_data = scrape_company_snapshot(soup)
@@ -255,16 +335,19 @@ def scrape_company_data(symbol):
         snapshot_path = os.path.join('financial_data', 'company_snapshot.csv')
         snapshot_df.to_csv(snapshot_path, index=False)
         print("Saved company_snapshot.csv")
+        saved = {'company_snapshot.csv': snapshot_df}
         
         # Scrape other financial data
-        scrape_financial_data(financial_url)
-        scrape_payout_data(payout_url)
+        saved.update(scrape_financial_data(financial_future.result()))
+        saved.update(scrape_payout_data(payout_future.result()))
         
         logging.info("Data scraping completed successfully!")
+        return saved
         
     except requests.RequestException as e:
         logging.error(f"Network error occurred: {str(e)}")
         logging.debug(traceback.format_exc())
+        return {}
     except Exception as e:
         logging.error(f"An unexpected error occurred: {str(e)}")
         logging.debug(traceback.format_exc())